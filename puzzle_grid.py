@@ -1,6 +1,27 @@
 import random
-from time import sleep
-from typing import List, Dict, Any, Set, Tuple, Optional, Callable
+from typing import List, Tuple, Optional, Callable
+
+# The values present in a row, column, or box are tracked as a 9-bit mask, where a set bit
+# v - 1 means the value v is present. A mask with all nine values present is 0x1FF. Since
+# masks only span 512 possible states, helper tables can be precomputed once at import.
+ALL_VALUES_MASK = 0x1FF
+# For each possible mask, the number of values it contains
+POPCOUNT = bytes(bin(mask).count("1") for mask in range(512))
+# For each possible mask, a tuple of the values it contains
+MASK_TO_LIST = tuple(tuple(v for v in range(1, 10) if mask & (1 << (v - 1))) for mask in range(512))
+# For each flat cell index y * 9 + x, the flat index of the 3 x 3 box containing that cell
+BOX_OF = bytes((y // 3) * 3 + (x // 3) for y in range(9) for x in range(9))
+# For each flat cell index, the row and column containing that cell
+ROW_OF = bytes(y for y in range(9) for x in range(9))
+COL_OF = bytes(x for y in range(9) for x in range(9))
+# For each value 1 - 9, its single-bit mask; BIT[0] is 0 so a blank maps to an empty mask
+BIT = tuple(0 if v == 0 else 1 << (v - 1) for v in range(10))
+# For each flat cell index, the 20 other cells sharing its row, column, or box
+PEERS_OF = tuple(
+    tuple(peer for peer in range(81)
+          if peer != index and (ROW_OF[peer] == ROW_OF[index] or COL_OF[peer] == COL_OF[index]
+                                or BOX_OF[peer] == BOX_OF[index]))
+    for index in range(81))
 
 
 class GridException(Exception):
@@ -11,15 +32,6 @@ class GridException(Exception):
         super().__init__(message)
 
 
-class SpaceMarker:
-    """Used in adding blank cells to a puzzle"""
-
-    def __init__(self, x: int, y: int, old_val: int):
-        self.x = x
-        self.y = y
-        self.old_val = old_val
-
-
 class PuzzleGrid:
     """
     Represents a grid containing a Sudoku puzzle. At the moment of instantiation, the grid will be entirely
@@ -31,11 +43,17 @@ class PuzzleGrid:
     might temporarily "write in" values, then remove them later.
     """
 
+    # Skipping the per-instance __dict__ makes attribute access an array index instead of a
+    # dict lookup, which matters for the solver's heavily-repeated grid operations
+    __slots__ = ('cells', 'row_mask', 'col_mask', 'box_mask', '_rng', 'required_spaces', 'solver_callback',
+                 '_space_snapshot', '_solver_cache', 'max_spaces_per_box', 'min_spaces_per_box',
+                 'space_failure_count', 'forgiving_space_distribution')
+
     NUM_ROWS = 9
     NUM_COLUMNS = 9
     BOX_SIZE = 3
-    NUM_BOXES_Y = int(NUM_ROWS / BOX_SIZE)
-    NUM_BOXES_X = int(NUM_COLUMNS / BOX_SIZE)
+    NUM_BOXES_Y = NUM_ROWS // BOX_SIZE
+    NUM_BOXES_X = NUM_COLUMNS // BOX_SIZE
 
     # We try many different configurations of blanks on a grid of numbers. If we get through some
     # number of failed configurations without success, we might as well just start over with a
@@ -45,21 +63,31 @@ class PuzzleGrid:
     possible_values = [i + 1 for i in range(9)]
 
     def __init__(self):
-        # Will contain values for initial puzzle. 1 to 9 for a provided value, 0 for a blank.
-        self.cells: Optional[List[List[int]]] = None
+        # Will contain values for initial puzzle, one byte per cell, indexed by y * NUM_COLUMNS + x.
+        # 1 to 9 for a provided value, 0 for a blank.
+        self.cells: Optional[bytearray] = None
 
         # The following are used in puzzle generation
         #
-        # For each row, a set containing values definitely present in that row
-        self.definite_values_per_row: Optional[List[Set[int]]] = None
-        # For each column, a set containing values definitely present in that column
-        self.definite_values_per_column: Optional[List[Set[int]]] = None
-        # For each box, a set containing values definitely present in that box
-        self.definite_values_per_box: Optional[List[List[Set[int]]]] = None
+        # For each row, a bitmask of values definitely present in that row
+        self.row_mask: Optional[List[int]] = None
+        # For each column, a bitmask of values definitely present in that column
+        self.col_mask: Optional[List[int]] = None
+        # For each box, a bitmask of values definitely present in that box, indexed by
+        # box_y * NUM_BOXES_X + box_x
+        self.box_mask: Optional[List[int]] = None
+
+        # Each grid gets its own generator, so the hot loops can call bound methods on it
+        # directly rather than going through the random module's global instance
+        self._rng = random.Random()
 
         self.required_spaces = 45
         self.solver_callback: Optional[Callable[[], bool]] = None
-        self.grid_with_spaces = None
+        # Cells and masks captured from the latest successful space configuration
+        self._space_snapshot: Optional[Tuple[bytes, List[int], List[int], List[int]]] = None
+        # Solvability results remembered per board state, so that backtracking doesn't re-solve
+        # a configuration of spaces it has already visited
+        self._solver_cache: dict = {}
         self.max_spaces_per_box = 1000
         self.min_spaces_per_box = 0
         self.space_failure_count = 0
@@ -69,11 +97,10 @@ class PuzzleGrid:
 
     def reset(self):
         """Clears the puzzle grid to a blank state"""
-        self.cells = [[0 for i in range(self.NUM_COLUMNS)] for j in range(self.NUM_ROWS)]
-        self.definite_values_per_row = [set() for i in range(self.NUM_ROWS)]
-        self.definite_values_per_column = [set() for i in range(self.NUM_COLUMNS)]
-        # For each box, a set containing values definitely present in that box
-        self.definite_values_per_box = [[set() for x in range(self.NUM_BOXES_X)] for y in range(self.NUM_BOXES_Y)]
+        self.cells = bytearray(self.NUM_ROWS * self.NUM_COLUMNS)
+        self.row_mask = [0] * self.NUM_ROWS
+        self.col_mask = [0] * self.NUM_COLUMNS
+        self.box_mask = [0] * (self.NUM_BOXES_X * self.NUM_BOXES_Y)
 
     def copy(self, other):
         """
@@ -86,10 +113,12 @@ class PuzzleGrid:
 
         other_grid: PuzzleGrid = other
         self.reset()
-        for y in range(self.NUM_ROWS):
-            for x in range(self.NUM_COLUMNS):
-                val = other_grid.get_value(x, y)
-                self.set_value(x, y, val)
+        # The other grid's cells and masks are already consistent with each other, so they can be
+        # copied wholesale rather than replayed cell-by-cell through set_value()
+        self.cells[:] = other_grid.cells
+        self.row_mask[:] = other_grid.row_mask
+        self.col_mask[:] = other_grid.col_mask
+        self.box_mask[:] = other_grid.box_mask
 
     def populate_from_list(self, hard_coded: List[List[int]]):
         """
@@ -100,14 +129,13 @@ class PuzzleGrid:
             raise GridException(f"Wrong number of rows: {len(hard_coded)}")
 
         self.reset()
-        self.cells = hard_coded
         for y in range(self.NUM_ROWS):
             hard_coded_row = hard_coded[y]
             if len(hard_coded_row) != self.NUM_COLUMNS:
                 raise GridException(f"Wrong number of entries ({len(hard_coded_row)}) in row {y}")
 
             for x in range(self.NUM_COLUMNS):
-                cell_val = self.cells[y][x]
+                cell_val = hard_coded_row[x]
 
                 if cell_val < 0 or cell_val > 9:
                     raise GridException(f"Bad cell value {cell_val}")
@@ -115,6 +143,22 @@ class PuzzleGrid:
                 if cell_val > 0:
                     self.set_value(x, y, cell_val)
 
+    def populate_from_flat(self, flat: bytes):
+        """
+        Populates the puzzle from a flat sequence of 81 cell values, such as a snapshot taken of
+        another grid's cells.
+        :raises GridException: if bad values
+        """
+        if len(flat) != self.NUM_ROWS * self.NUM_COLUMNS:
+            raise GridException(f"Wrong number of cells: {len(flat)}")
+
+        self.reset()
+        for index, cell_val in enumerate(flat):
+            if cell_val < 0 or cell_val > 9:
+                raise GridException(f"Bad cell value {cell_val}")
+            if cell_val > 0:
+                self.set_value(index % self.NUM_COLUMNS, index // self.NUM_COLUMNS, cell_val)
+
     def populate_from_handle(self, handle: str):
         """
         From a handle (a hash), populate a puzzle. See _generate_handle() for details about the formula.
@@ -159,7 +203,7 @@ class PuzzleGrid:
             decimal_handle = decimal_handles[y]
             for x in range(self.NUM_COLUMNS):
                 val = decimal_handle % 10
-                decimal_handle = int(decimal_handle / 10)
+                decimal_handle //= 10
                 self.set_value(x, y, val)
 
     def print_cells(self):
@@ -167,25 +211,29 @@ class PuzzleGrid:
         Prints out an attractive representation of the Sudoku puzzle. See README for examples.
         """
 
-        def print_separator_row():
-            row_str = "+"
+        def make_separator_row() -> str:
+            parts = ["+"]
             for x in range(self.NUM_COLUMNS):
-                row_str += "--"
+                parts.append("--")
                 if x % self.BOX_SIZE == self.BOX_SIZE - 1:
-                    row_str += "-+"
-            print(row_str)
+                    parts.append("-+")
+            return "".join(parts)
 
-        print_separator_row()
-        for y, row in enumerate(self.cells):
-            row_str = "|"
-            for x, cell in enumerate(row):
+        separator_row = make_separator_row()
+        # Collect the whole board and write it with one print, rather than a print per line
+        lines = [separator_row]
+        for y in range(self.NUM_ROWS):
+            parts = ["|"]
+            for x in range(self.NUM_COLUMNS):
+                cell = self.cells[y * self.NUM_COLUMNS + x]
                 cell_str = " " if cell == 0 else f"{cell}"
-                row_str += f" {cell_str}"
+                parts.append(f" {cell_str}")
                 if x % self.BOX_SIZE == self.BOX_SIZE - 1:
-                    row_str += " |"
-            print(row_str)
+                    parts.append(" |")
+            lines.append("".join(parts))
             if y % self.BOX_SIZE == self.BOX_SIZE - 1:
-                print_separator_row()
+                lines.append(separator_row)
+        print("\n".join(lines))
 
     def super_print(self):
         """
@@ -246,15 +294,15 @@ class PuzzleGrid:
 
         for y in range(self.NUM_ROWS):
             # All the row strings from each cell will be appended to these
-            row_strs = ["", "", "", "", ""]
+            row_parts = [[], [], [], [], []]
             for x in range(self.NUM_COLUMNS):
-                val = self.cells[y][x]
+                val = self.cells[y * self.NUM_COLUMNS + x]
                 lines = _make_cell(x, y, val)
                 for idx, line in enumerate(lines):
-                    row_strs[idx] = row_strs[idx] + line
-            for row in row_strs:
-                if len(row) > 0:
-                    print(row)
+                    row_parts[idx].append(line)
+            for parts in row_parts:
+                if len(parts) > 0:
+                    print("".join(parts))
 
         print(f"Handle: {self._generate_handle()}")
 
@@ -262,7 +310,7 @@ class PuzzleGrid:
         """Gets the value at a particular cell, returning 0 if a blank cell"""
         if x < 0 or x >= self.NUM_COLUMNS or y < 0 or y >= self.NUM_ROWS:
             raise GridException(f"Bad coordinates ({x},{y})")
-        return self.cells[y][x]
+        return self.cells[y * self.NUM_COLUMNS + x]
 
     def set_value(self, x: int, y: int, val: int):
         """
@@ -279,45 +327,45 @@ class PuzzleGrid:
         if val < 0 or val > 9:
             raise GridException(f"Bad value {val}")
 
-        box_x, box_y = self.get_box_coordinates(x, y)
-        box_definites = self.definite_values_per_box[box_y][box_x]
+        box_index = BOX_OF[y * self.NUM_COLUMNS + x]
 
         if val == 0:
             existing_val = self.get_value(x, y)
             if existing_val > 0:
-                box_definites.discard(existing_val)
-                self.definite_values_per_row[y].discard(existing_val)
-                self.definite_values_per_column[x].discard(existing_val)
+                bit = BIT[existing_val]
+                self.box_mask[box_index] &= ~bit
+                self.row_mask[y] &= ~bit
+                self.col_mask[x] &= ~bit
 
-        self.cells[y][x] = val
+        self.cells[y * self.NUM_COLUMNS + x] = val
 
         if val > 0:
-            if val in box_definites:
+            bit = BIT[val]
+            if self.box_mask[box_index] & bit:
                 raise GridException(f"Cell value {val} in box twice")
-            box_definites.add(val)
-            if val in self.definite_values_per_row[y]:
+            self.box_mask[box_index] |= bit
+            if self.row_mask[y] & bit:
                 raise GridException(f"Cell value {val} in row twice")
-            self.definite_values_per_row[y].add(val)
-            if val in self.definite_values_per_column[x]:
+            self.row_mask[y] |= bit
+            if self.col_mask[x] & bit:
                 raise GridException(f"Cell value {val} in column twice")
-            self.definite_values_per_column[x].add(val)
+            self.col_mask[x] |= bit
 
-    def get_possible_values(self, x: int, y: int) -> Tuple[bool, Set[int]]:
+    def get_possible_values(self, x: int, y: int) -> Tuple[bool, int]:
         """
         Gets the possible values that can go into a cell, if it's currently blank.
         :param x: x coordinate of cell
         :param y: y coordinate of cell
-        :return: (True if blank cell, set of values that can possibly go into cell -- empty if non-blank cell)
+        :return: (True if blank cell, bitmask of values that can possibly go into cell -- 0 if
+            non-blank cell. MASK_TO_LIST expands the mask to actual values.)
         """
         if x < 0 or x >= self.NUM_COLUMNS or y < 0 or y >= self.NUM_ROWS:
             raise GridException(f"Bad coordinates ({x},{y})")
 
-        box_x, box_y = self.get_box_coordinates(x, y)
-        box_definites = self.definite_values_per_box[box_y][box_x]
-        if self.cells[y][x] > 0:
-            return False, set()
-        return True, set(self.possible_values) - box_definites - self.definite_values_per_row[y] - \
-                     self.definite_values_per_column[x]
+        if self.cells[y * self.NUM_COLUMNS + x] > 0:
+            return False, 0
+        used = self.row_mask[y] | self.col_mask[x] | self.box_mask[BOX_OF[y * self.NUM_COLUMNS + x]]
+        return True, ALL_VALUES_MASK & ~used
 
     @staticmethod
     def get_box_coordinates(cell_x: int, cell_y: int) -> Tuple[int, int]:
@@ -332,7 +380,8 @@ class PuzzleGrid:
         """
         if cell_x < 0 or cell_x >= PuzzleGrid.NUM_COLUMNS or cell_y < 0 or cell_y >= PuzzleGrid.NUM_ROWS:
             raise GridException(f"Bad coordinates ({cell_x},{cell_y})")
-        return int(cell_x / PuzzleGrid.BOX_SIZE), int(cell_y / PuzzleGrid.BOX_SIZE)
+        box_index = BOX_OF[cell_y * PuzzleGrid.NUM_COLUMNS + cell_x]
+        return box_index % PuzzleGrid.NUM_BOXES_X, box_index // PuzzleGrid.NUM_BOXES_X
 
     def clear_row(self, y: int):
         """
@@ -341,16 +390,19 @@ class PuzzleGrid:
         """
         if y < 0 or y >= self.NUM_ROWS:
             raise GridException(f"Bad coordinate {y}")
+        cells = self.cells
+        col_mask = self.col_mask
+        box_mask = self.box_mask
+        row_base = y * self.NUM_COLUMNS
         for x in range(self.NUM_COLUMNS):
-            current_val = self.cells[y][x]
-            self.definite_values_per_row[y].discard(current_val)
-            self.definite_values_per_column[x].discard(current_val)
-
-            box_x, box_y = self.get_box_coordinates(x, y)
-            box_definite = self.definite_values_per_box[box_y][box_x]
-            box_definite.discard(current_val)
+            current_val = cells[row_base + x]
+            if current_val > 0:
+                bit = BIT[current_val]
+                self.row_mask[y] &= ~bit
+                col_mask[x] &= ~bit
+                box_mask[BOX_OF[row_base + x]] &= ~bit
 
-            self.cells[y][x] = 0
+            cells[row_base + x] = 0
 
     def clear_all_rows(self):
         """
@@ -389,36 +441,45 @@ class PuzzleGrid:
         """
         self.required_spaces = required_spaces
         self.solver_callback = solver_callback
-        self.grid_with_spaces = None
-        avg_spaces_per_box = int(required_spaces / (self.NUM_BOXES_X * self.NUM_BOXES_Y))
+        self._space_snapshot = None
+        self._solver_cache = {}
+        avg_spaces_per_box = required_spaces // (self.NUM_BOXES_X * self.NUM_BOXES_Y)
         # print(f"Average spaces per box: {avg_spaces_per_box}")
         self.min_spaces_per_box = avg_spaces_per_box - 1
         self.max_spaces_per_box = avg_spaces_per_box + 1
         self.space_failure_count = 0
         self.forgiving_space_distribution = forgiving_distribution
 
-        # Will contain shuffled list of all possible cell coordinates
-        space_markers: List[SpaceMarker] = []
-        for y in range(self.NUM_ROWS):
-            for x in range(self.NUM_COLUMNS):
-                old_val = self.get_value(x, y)
-                marker = SpaceMarker(x, y, old_val)
-                space_markers.append(marker)
-        random.shuffle(space_markers)
-
-        index = 0
-        space_count = 0
+        # Shuffled flat indices of all cells. Two parallel byte arrays -- the cell index of each
+        # marker and the value originally at that cell -- stand in for a list of 81 marker objects.
+        shuffled = list(range(self.NUM_ROWS * self.NUM_COLUMNS))
+        self._rng.shuffle(shuffled)
+
+        # Reorder the shuffled markers so that consecutive markers cycle through the nine boxes.
+        # The search then fills boxes evenly as it goes, which prunes configurations that would
+        # fail the space-distribution check much sooner. Each box contributes exactly nine markers,
+        # so zip() interleaves them cleanly; the order within each box stays random.
+        markers_per_box = [[] for _ in range(self.NUM_BOXES_X * self.NUM_BOXES_Y)]
+        for cell_index in shuffled:
+            markers_per_box[BOX_OF[cell_index]].append(cell_index)
+        marker_cell = bytes(cell_index for group in zip(*markers_per_box) for cell_index in group)
+        marker_old_val = bytes(self.cells[cell_index] for cell_index in marker_cell)
 
         try:
-            success = self._add_spaces_impl(space_markers, index, space_count)
+            success = self._add_spaces_impl(marker_cell, marker_old_val)
         except GridException as ex:
             # Restore grid to the way it was, minus any spaces
-            for marker in space_markers:
-                self.set_value(marker.x, marker.y, marker.old_val)
+            for index, cell_index in enumerate(marker_cell):
+                self.set_value(cell_index % self.NUM_COLUMNS, cell_index // self.NUM_COLUMNS,
+                               marker_old_val[index])
             raise ex
 
-        if success and self.grid_with_spaces:
-            self.copy(self.grid_with_spaces)
+        if success and self._space_snapshot:
+            cells, row_mask, col_mask, box_mask = self._space_snapshot
+            self.cells[:] = cells
+            self.row_mask[:] = row_mask
+            self.col_mask[:] = col_mask
+            self.box_mask[:] = box_mask
         return success
 
     def generate_puzzle(self, solver_callback: Callable[[], bool], required_spaces: int = 45, forgiving_distribution: bool = False) -> bool:
@@ -455,32 +516,61 @@ class PuzzleGrid:
         """
         max_row_redos = 20
         failed = False
+        # Bound once here so the per-cell loop only touches locals -- LOAD_FAST instead of
+        # attribute and module lookups
+        _randrange = self._rng.randrange
+        _popcount = POPCOUNT
+        _box_of = BOX_OF
+        clear_row = self.clear_row
+        cells = self.cells
+        row_mask = self.row_mask
+        col_mask = self.col_mask
+        box_mask = self.box_mask
+        num_columns = self.NUM_COLUMNS
         for y in range(self.NUM_ROWS):
             redo_count = 0
+            row_base = y * num_columns
             # Keep trying until we get a row that conforms to Sudoku rules
             while redo_count < max_row_redos:
-                self.clear_row(y)
-                row_options = set(self.possible_values)
-                for x in range(self.NUM_COLUMNS):
+                clear_row(y)
+                row_options = ALL_VALUES_MASK
+                for x in range(num_columns):
                     # We must choose a value that:
                     # - isn't already in this column
                     # - isn't already in this box
 
-                    box_x, box_y = self.get_box_coordinates(x, y)
-                    box_definite = self.definite_values_per_box[box_y][box_x]
+                    box_index = _box_of[row_base + x]
 
-                    choices = row_options - self.definite_values_per_column[x] - box_definite
-                    if len(choices) == 0:
+                    choices = row_options & ~(col_mask[x] | box_mask[box_index])
+                    if choices == 0:
                         # Oops, there's no value that will work in this cell, time to redo the whole
                         # row.
                         failed = True
                         break
-                    choice = random.choice(list(choices))
-                    self.cells[y][x] = choice
-                    row_options.discard(choice)
-                    self.definite_values_per_row[y].add(choice)
-                    self.definite_values_per_column[x].add(choice)
-                    box_definite.add(choice)
+                    # Pick a random set bit of the candidate mask directly: decide which of the
+                    # set bits to take, then clear lower set bits until it's the lowest one left
+                    k = _randrange(_popcount[choices])
+                    m = choices
+                    while k:
+                        m &= m - 1
+                        k -= 1
+                    bit = m & -m
+                    choice = bit.bit_length()
+                    cells[row_base + x] = choice
+                    row_options &= ~bit
+                    row_mask[y] |= bit
+                    col_mask[x] |= bit
+                    box_mask[box_index] |= bit
+
+                    # Forward check: if the choice just made leaves a later cell in this row with
+                    # no feasible value, the row is already doomed, so fail it now instead of
+                    # finding out one placement at a time
+                    for x2 in range(x + 1, num_columns):
+                        if not row_options & ~(col_mask[x2] | box_mask[_box_of[row_base + x2]]):
+                            failed = True
+                            break
+                    if failed:
+                        break
                 if failed:
                     # Generating the row failed due to duplicate values in a single box or single column.
                     # So, we simply start the row over and try again
@@ -492,69 +582,102 @@ class PuzzleGrid:
                 return False
         return True
 
-    def _add_spaces_impl(self, space_markers: List[SpaceMarker], index: int, space_count: int) -> bool:
+    def _add_spaces_impl(self, marker_cell: bytes, marker_old_val: bytes) -> bool:
         """
-        This recursive function does the work of adding spaces to the grid. We keep recursing until we find
-        a solution that works. If we hit a point of failure, we backtrack and try another path. Standard
-        depth-first stuff.
+        This function does the work of adding spaces to the grid. It's a depth-first search over a
+        binary tree of decisions -- "put a space at this cell" vs. "leave the cell alone" -- but run
+        as an explicit loop rather than a recursive function, so that no Python stack frames have to
+        be created and torn down on the way to a solution. We keep pressing forward until we find a
+        configuration that works. If we hit a point of failure, we backtrack and try another path.
 
-        :param space_markers: a randomized list of unique cells. Each marker includes the value that will
-            ultimately appear in the final, solved puzzle.
-        :param index: how far we've recursed into the space_markers list
-        :param space_count: how many spaces have been added to the grid thus far, through all the
-            recursion steps
+        :param marker_cell: flat cell indices of the markers, in randomized order
+        :param marker_old_val: for each marker, the value that will ultimately appear at that cell
+            in the final, solved puzzle
         :return: True if a solution was found
         """
-        if space_count >= self.required_spaces:
-            # We've recursed far enough as to have added the required number of spaces, but
-            # can we USE this configuration of spaces?
-            if not self._check_space_distribution():
+        num_markers = len(marker_cell)
+        # For each marker index, which decision is currently in effect along the active path:
+        # 0 = not visited, 1 = space placed at the cell, 2 = cell left alone
+        decision = bytearray(num_markers)
+        index = 0
+        space_count = 0
+
+        # Local bindings for everything the search loop touches repeatedly
+        _box_of = BOX_OF
+        _popcount = POPCOUNT
+        set_value = self.set_value
+        solver_callback = self.solver_callback
+        solver_cache = self._solver_cache
+        cells = self.cells
+        box_mask = self.box_mask
+        required_spaces = self.required_spaces
+        max_spaces_per_box = self.max_spaces_per_box
+        box_cells = self.BOX_SIZE * self.BOX_SIZE
+        num_columns = self.NUM_COLUMNS
+
+        while True:
+            if space_count >= required_spaces:
+                # We've descended far enough as to have added the required number of spaces, but
+                # can we USE this configuration of spaces?
+                if self._check_space_distribution():
+                    # Snapshot the raw state rather than allocating a whole scratch PuzzleGrid
+                    self._space_snapshot = (bytes(self.cells), self.row_mask[:],
+                                            self.col_mask[:], self.box_mask[:])
+                    return True
+
                 self.space_failure_count += 1
                 if self.space_failure_count >= self.MAX_FAILED_SPACE_CONFIGURATIONS:
                     raise GridException(
                         f"Too many failed space configurations. Number tried: {self.space_failure_count}")
-                return False
-
-            self.grid_with_spaces = PuzzleGrid()
-            self.grid_with_spaces.copy(self)
-            return True
-
-        # How many more spaces do we need? Is there room for them?
-        needed_spaces = self.required_spaces - space_count
-        if (len(space_markers) - index) < needed_spaces:
-            # Nope, halt further recursion
-            return False
-
-        for i in range(2):
-            if i == 0:
-                # Put a space here
-                marker = space_markers[index]
-                self.set_value(marker.x, marker.y, 0)
+            elif (num_markers - index) >= (required_spaces - space_count):
+                # There's still room for the remaining spaces we need. Try putting a space here first.
+                cell_index = marker_cell[index]
+                set_value(cell_index % num_columns, cell_index // num_columns, 0)
 
                 # Are spaces properly distributed? We can only have so many per box.
-                box_x, box_y = self.get_box_coordinates(marker.x, marker.y)
-                box_definites = self.definite_values_per_box[box_y][box_x]
-                spaces_in_box = self.BOX_SIZE * self.BOX_SIZE - len(box_definites)
-
-                # We must have an acceptable number of spaces in this box to proceed with recursion
                 # (Reminder: a box is different from a cell)
-                if spaces_in_box <= self.max_spaces_per_box:
-                    # Is the grid solvable from here? If not, no point to adding more spaces.
-                    solvable = self.solver_callback()
+                box_definites = box_mask[_box_of[cell_index]]
+                spaces_in_box = box_cells - _popcount[box_definites]
+
+                if spaces_in_box <= max_spaces_per_box:
+                    # Is the grid still solvable with this space added? Backtracking revisits the
+                    # same board states often, so remember the verdict for each one.
+                    key = bytes(cells)
+                    solvable = solver_cache.get(key)
+                    if solvable is None:
+                        solvable = solver_callback()
+                        solver_cache[key] = solvable
                     if solvable:
-                        success = self._add_spaces_impl(space_markers, index + 1, space_count + 1)
-                        if success:
-                            return True
-
-                # Restore the value that used to be there
-                self.set_value(marker.x, marker.y, marker.old_val)
-            else:
-                # Don't put a space here. Just move on with the recursion.
-                success = self._add_spaces_impl(space_markers, index + 1, space_count)
-                if success:
-                    return True
-
-        return False
+                        # It is, descend further
+                        decision[index] = 1
+                        index += 1
+                        space_count += 1
+                        continue
+
+                # Either the box has too many spaces or the puzzle is no longer solvable. Restore
+                # the value that used to be there and leave the cell alone instead.
+                set_value(cell_index % num_columns, cell_index // num_columns, marker_old_val[index])
+                decision[index] = 2
+                index += 1
+                continue
+
+            # This path failed. Backtrack to the most recent marker with a decision still untried.
+            while True:
+                index -= 1
+                if index < 0:
+                    # The entire tree has been explored without success
+                    return False
+                if decision[index] == 1:
+                    # The "space here" branch below this point failed; undo it and try leaving
+                    # the cell alone
+                    cell_index = marker_cell[index]
+                    set_value(cell_index % num_columns, cell_index // num_columns, marker_old_val[index])
+                    space_count -= 1
+                    decision[index] = 2
+                    index += 1
+                    break
+                # Both decisions for this marker are exhausted, keep unwinding
+                decision[index] = 0
 
     def _check_space_distribution(self) -> bool:
         """
@@ -564,18 +687,16 @@ class PuzzleGrid:
 
         :return: True if the spaces are well-distributed.
         """
-        average_spaces_per_box = int(self.required_spaces / (self.NUM_BOXES_X * self.NUM_BOXES_Y))
-        boxes_with_avg_num_spaces = 0
-        for box_y in range(self.NUM_BOXES_Y):
-            for box_x in range(self.NUM_BOXES_X):
-                box_definites = self.definite_values_per_box[box_y][box_x]
-                spaces_in_box = self.BOX_SIZE * self.BOX_SIZE - len(box_definites)
-                if spaces_in_box == average_spaces_per_box:
-                    boxes_with_avg_num_spaces += 1
-                # We must have an acceptable number of spaces in this box to proceed
-                if spaces_in_box > self.max_spaces_per_box or spaces_in_box < self.min_spaces_per_box:
-                    return False
-        return True if self.forgiving_space_distribution else boxes_with_avg_num_spaces >= 5
+        average_spaces_per_box = self.required_spaces // (self.NUM_BOXES_X * self.NUM_BOXES_Y)
+        box_cells = self.BOX_SIZE * self.BOX_SIZE
+        spaces_per_box = [box_cells - POPCOUNT[mask] for mask in self.box_mask]
+        # We must have an acceptable number of spaces in every box to proceed
+        if any(spaces > self.max_spaces_per_box or spaces < self.min_spaces_per_box
+               for spaces in spaces_per_box):
+            return False
+        if self.forgiving_space_distribution:
+            return True
+        return sum(1 for spaces in spaces_per_box if spaces == average_spaces_per_box) >= 5
 
     def _generate_handle(self) -> str:
         """
@@ -592,7 +713,7 @@ class PuzzleGrid:
         for y in range(self.NUM_ROWS):
             decimal_handle = 0
             for x in range(self.NUM_COLUMNS):
-                decimal_handle += self.cells[y][x] * (10 ** x)
+                decimal_handle += self.cells[y * self.NUM_COLUMNS + x] * (10 ** x)
             base10_rows.append(decimal_handle)
 
         def _part_convertor(_part: int) -> str:
@@ -614,7 +735,7 @@ class PuzzleGrid:
             decimal_handle = base10_row
             alphabet_handle_parts = []
             while decimal_handle > 0:
-                division_result = int(decimal_handle / 64)
+                division_result = decimal_handle // 64
                 remainder = decimal_handle % 64
                 decimal_handle = division_result
                 alphabet_handle_parts.insert(0, remainder)
@@ -1,5 +1,6 @@
-from puzzle_grid import PuzzleGrid, GridException
-from typing import List, Any, Set, Tuple, Optional
+from puzzle_grid import PuzzleGrid, GridException, ALL_VALUES_MASK, POPCOUNT, MASK_TO_LIST, \
+    BOX_OF, ROW_OF, COL_OF, BIT, PEERS_OF
+from typing import List, Tuple, Optional
 
 sample_puzzle = [
     [8, 5, 0, 0, 0, 1, 0, 0, 6],
@@ -47,18 +48,19 @@ class BruteForceSolver:
 
     def __init__(self, grid: PuzzleGrid):
         self.grid: PuzzleGrid = grid
-        # This will be a two-dimensional list. For each cell, there's a list containing values that
-        # would work in that call, if it's blank. If not blank, the list will be empty.
-        self.options: List[List[List[int]]] = []
+        # For each cell (flat index, matching the grid's cell layout), a bitmask of values that
+        # would work in that cell, if it's blank. If not blank, the mask will be 0.
+        self.options: List[int] = []
+        self._rebuild_options()
 
-        for y in range(PuzzleGrid.NUM_ROWS):
-            options_row: List[List[int]] = []
-            for x in range(PuzzleGrid.NUM_COLUMNS):
-                empty_cell, options = self.grid.get_possible_values(x, y)
-                options_row.append(list(options))
-            self.options.append(options_row)
+        # Undo records for the incremental option updates made by _assign, one per assignment
+        # currently in effect, in assignment order
+        self._option_undo: List[Tuple[int, List[int]]] = []
 
         self.solved_puzzle: Optional[PuzzleGrid] = None
+        # Cell snapshot of the most recent solution found; turned into a full PuzzleGrid only
+        # once solving is finished
+        self._solved_cells: Optional[bytes] = None
 
     def set_value(self, x: int, y: int, val: int):
         """
@@ -67,62 +69,217 @@ class BruteForceSolver:
         :param y: --
         :param val: 0 for blank cell, 1 - 9 otherwise
         """
-        options_list = self.options[y][x]
-        options_list.clear()
         self.grid.set_value(x, y, val)
         if val == 0:
-            empty_cell, options = self.grid.get_possible_values(x, y)
-            options_list.extend(options)
+            empty_cell, options_mask = self.grid.get_possible_values(x, y)
+            self.options[y * PuzzleGrid.NUM_COLUMNS + x] = options_mask
+        else:
+            self.options[y * PuzzleGrid.NUM_COLUMNS + x] = 0
 
-    def solve(self) -> Tuple[int, Optional[PuzzleGrid]]:
+    def _rebuild_options(self):
+        """
+        Recomputes the candidate mask of every cell from the grid's current state. Called before
+        each solve, since the grid may have been changed from outside since the last one.
+        """
+        self.options.clear()
+        for y in range(PuzzleGrid.NUM_ROWS):
+            for x in range(PuzzleGrid.NUM_COLUMNS):
+                empty_cell, options_mask = self.grid.get_possible_values(x, y)
+                self.options.append(options_mask)
+
+    def solve(self, limit: Optional[int] = None) -> Tuple[int, Optional[PuzzleGrid]]:
         """
         Tries to solve the puzzle.
+        :param limit: if given, stop searching once this many solutions have been found. A caller
+            that only cares whether the puzzle has exactly one solution can pass 2 and skip the
+            cost of enumerating every remaining solution.
         :return: (number of possible solutions, a PuzzleGrid containing a solution that works (or None))
         """
-        success_count = self._solve_impl(0)
+        self._rebuild_options()
+        self._option_undo.clear()
+        success_count = self._solve_impl(limit)
+        if success_count > 0:
+            if self.solved_puzzle is None:
+                self.solved_puzzle = PuzzleGrid()
+            self.solved_puzzle.populate_from_flat(self._solved_cells)
         return success_count, self.solved_puzzle
 
-    def _solve_impl(self, index: int) -> int:
+    def _assign(self, index: int, val: int):
         """
-        Recursive solve function. Think of the grid being converted to a one-dimensional list
-        of cells (from top-left to bottom-right, typewriter style). The index marks how far
-        we've recursed into that list.
+        Writes a value into a blank cell, updating the grid's cells and masks directly. This is
+        the solver's internal fast path: the cell is known to be blank and the value known to be
+        legal, so the validation and double-entry checks of PuzzleGrid.set_value aren't needed.
 
-        :param index: --
-        :return: number of solutions recursively found, or 0
+        The candidate masks in self.options are updated incrementally: only the cell's 20 peers
+        can be affected, and the ones that actually change are recorded so _unassign can put the
+        bit back without recomputing anything.
         """
-        if index >= PuzzleGrid.NUM_ROWS * PuzzleGrid.NUM_COLUMNS:
-            # We've recursed all the way to the end of the one-dimensional list, therefore a
-            # solution has been found.
-            if self.solved_puzzle is None:
-                self.solved_puzzle = PuzzleGrid()
-            self.solved_puzzle.copy(self.grid)
-            return 1
-        x, y = self._index_to_coordinate(index)
-        empty_cell, options = self.grid.get_possible_values(x, y)
-        if empty_cell and len(options) == 0:
-            # There are no possible options that would work, return failure
-            return 0
-        if not empty_cell:
-            # This is not a blank cell, recursively advance to next cell
-            return self._solve_impl(index + 1)
+        grid = self.grid
+        options = self.options
+        bit = BIT[val]
+
+        touched: List[int] = []
+        for peer in PEERS_OF[index]:
+            if options[peer] & bit:
+                options[peer] ^= bit
+                touched.append(peer)
+        self._option_undo.append((options[index], touched))
+        options[index] = 0
+
+        grid.cells[index] = val
+        grid.row_mask[ROW_OF[index]] |= bit
+        grid.col_mask[COL_OF[index]] |= bit
+        grid.box_mask[BOX_OF[index]] |= bit
+
+    def _unassign(self, index: int):
+        """Reverts _assign, making the cell blank again. Assignments are strictly last-in
+        first-out during the search, so the top undo record always belongs to this cell."""
+        grid = self.grid
+        options = self.options
+        bit = BIT[grid.cells[index]]
+
+        old_options, touched = self._option_undo.pop()
+        for peer in touched:
+            options[peer] |= bit
+        options[index] = old_options
+
+        grid.cells[index] = 0
+        grid.row_mask[ROW_OF[index]] &= ~bit
+        grid.col_mask[COL_OF[index]] &= ~bit
+        grid.box_mask[BOX_OF[index]] &= ~bit
+
+    def _propagate(self, assigned: List[int]) -> bool:
+        """
+        Repeatedly fills in "naked singles" -- blank cells with exactly one candidate value --
+        until none remain or a contradiction is found. Such cells are forced, so filling them
+        without branching shrinks the search tree before any guessing happens.
+
+        :param assigned: output parameter; flat indices of the cells this call filled in, so the
+            caller can undo them when backtracking
+        :return: False if some blank cell ended up with no candidates (a contradiction)
+        """
+        cells = self.grid.cells
+        options = self.options
+        changed = True
+        while changed:
+            changed = False
+            for index in range(PuzzleGrid.NUM_ROWS * PuzzleGrid.NUM_COLUMNS):
+                if cells[index] == 0:
+                    candidates = options[index]
+                    if candidates == 0:
+                        return False
+                    if POPCOUNT[candidates] == 1:
+                        # A single-bit mask: the bit position gives the forced value directly
+                        self._assign(index, candidates.bit_length())
+                        assigned.append(index)
+                        changed = True
+        return True
+
+    def _solve_impl(self, limit: Optional[int] = None) -> int:
+        """
+        Iterative solve loop. Conceptually this is a depth-first search: each level first fills in
+        all forced cells via _propagate, then branches on the blank cell with the fewest remaining
+        candidate values -- the "most constrained variable" heuristic, which keeps the search tree
+        narrow near its top. Rather than recursing one function call per level, the search keeps
+        an explicit stack of frames, so that the many steps taken on a hard puzzle don't each pay
+        for Python call setup and teardown.
+
+        :param limit: if given, stop searching once this many solutions have been found
+        :return: number of solutions found, or 0
+        """
+        cells = self.grid.cells
+        options = self.options
+        num_cells = PuzzleGrid.NUM_ROWS * PuzzleGrid.NUM_COLUMNS
+
+        # Each frame is [branch cell, mask of candidate values not yet tried, cells assigned by
+        # _propagate at this level, True if a branch value is currently written into the cell]
+        stack: List[list] = []
         success_count = 0
-        for val in options:
-            # Let's try this value, then recursively advance to next cell
-            self.set_value(x, y, val)
-            recursive_success_count = self._solve_impl(index + 1)
-            success_count += recursive_success_count
-            self.set_value(x, y, 0)
+        descend = True
+
+        while True:
+            if descend:
+                # Entering a new level: fill in forced cells, then pick a cell to branch on
+                forced: List[int] = []
+                failed = not self._propagate(forced)
+
+                best_index = -1
+                best_mask = 0
+                if not failed:
+                    best_count = 10
+                    for index in range(num_cells):
+                        if cells[index] == 0:
+                            candidates = options[index]
+                            if candidates == 0:
+                                # A blank cell with no possible value, this path has failed
+                                failed = True
+                                break
+                            count = POPCOUNT[candidates]
+                            if count < best_count:
+                                best_index = index
+                                best_mask = candidates
+                                best_count = count
+                                if count == 1:
+                                    # Can't do better than a forced cell, stop scanning
+                                    break
+
+                if not failed and best_index == -1:
+                    # No blank cells remain, therefore a solution has been found. Snapshotting the
+                    # raw cells is all that's needed; solve() builds the full grid once at the end.
+                    self._solved_cells = bytes(cells)
+                    success_count += 1
+                    if limit is not None and success_count >= limit:
+                        break
+                    # Treat the solution as a dead end so the search backtracks for more
+                    failed = True
+
+                if failed:
+                    self._undo_assignments(forced)
+                    descend = False
+                    continue
+
+                stack.append([best_index, best_mask, forced, False])
+
+            # Advance the top frame to its next untried candidate, unwinding exhausted frames
+            if not stack:
+                return success_count
+            frame = stack[-1]
+            remaining = frame[1]
+            if remaining:
+                bit = remaining & -remaining
+                frame[1] = remaining ^ bit
+                if frame[3]:
+                    self._unassign(frame[0])
+                self._assign(frame[0], bit.bit_length())
+                frame[3] = True
+                descend = True
+            else:
+                if frame[3]:
+                    self._unassign(frame[0])
+                self._undo_assignments(frame[2])
+                stack.pop()
+
+        # Only reached when the solution limit cut the search short: restore the grid by
+        # unwinding everything still assigned along the active path
+        self._undo_assignments(forced)
+        for frame in reversed(stack):
+            if frame[3]:
+                self._unassign(frame[0])
+            self._undo_assignments(frame[2])
         return success_count
 
+    def _undo_assignments(self, assigned: List[int]):
+        """Blanks out the given cells again, in reverse assignment order"""
+        for index in reversed(assigned):
+            self._unassign(index)
+
     @staticmethod
     def _index_to_coordinate(index: int) -> Tuple[int, int]:
         """
         If the grid is "unrolled" into a one-dimensional list, this function takes an index into
         that list and returns the corresponding two-dimensional coordinates.
         """
-        row = int(index / PuzzleGrid.NUM_COLUMNS)
-        column = index % PuzzleGrid.NUM_COLUMNS
+        row, column = divmod(index, PuzzleGrid.NUM_COLUMNS)
         return column, row
 
 
@@ -20,7 +20,8 @@ def main(num_spaces: int, forgiving_distribution: bool, solve: bool, handle: Opt
     solver = BruteForceSolver(grid)
 
     def solver_func() -> bool:
-        solution_count, solution_grip = solver.solve()
+        # Only uniqueness matters here, so the solver can stop at the second solution it finds
+        solution_count, solution_grip = solver.solve(limit=2)
         return solution_count == 1
 
     if handle: